@@ -6,6 +6,7 @@ load_dotenv()
 JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "your_default_jwt_secret")
 JWT_EXPIRY = int(os.getenv("JWT_EXPIRY", 60))
 UPLOADS_DIR = "data/uploads"
-DB_PATH = os.path.join("data/db", "app.db")
+DB_PATH = os.getenv("DB_PATH", os.path.join("data/db", "app.db"))
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+WORKER_CONCURRENCY = int(os.getenv("WORKER_CONCURRENCY", min(8, os.cpu_count() or 1)))
 os.makedirs(UPLOADS_DIR, exist_ok=True)
@@ -1,8 +1,10 @@
 import os
 import asyncio
 from fastapi import Depends, FastAPI
+from app.config import WORKER_CONCURRENCY
 from app.routes import auth, documents
-from app.services.queue_worker import background_worker
+from app.services.persistence import close_db_connections
+from app.services.queue_worker import background_worker, shutdown_extractor_pool, start_extractor_pool
 
 app = FastAPI()
 
@@ -24,10 +26,14 @@ async def startup():
     os.makedirs(UPLOADS_DIR, exist_ok=True)  
     os.makedirs(DB_DIR, exist_ok=True) 
 
-    asyncio.create_task(background_worker()) 
-    print("Background worker has started.")
+    start_extractor_pool()
+    for _ in range(WORKER_CONCURRENCY):
+        asyncio.create_task(background_worker())
+    print(f"{WORKER_CONCURRENCY} background workers have started.")
 
 @app.on_event("shutdown")
 async def shutdown():
     print("Shutting down the application...")
+    shutdown_extractor_pool()
+    close_db_connections()
 
@@ -1,6 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from pydantic import BaseModel
 from datetime import datetime, timedelta, timezone
+import hashlib
+import threading
+import time
+import cachetools
 import jwt
 from jwt import ExpiredSignatureError, InvalidTokenError
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
@@ -9,6 +13,15 @@ from app.config import JWT_SECRET_KEY, JWT_EXPIRY
 router = APIRouter()
 security = HTTPBearer(auto_error=False)
 
+# Prepared once so PyJWT doesn't re-encode the secret on every call.
+_HS256_KEY = JWT_SECRET_KEY.encode("utf-8")
+_JWT_ALGORITHMS = ["HS256"]
+
+# Verified tokens keyed by SHA-256 digest (raw tokens are never stored),
+# mapped to (username, exp) so a hit can skip the HMAC check entirely.
+_token_cache = cachetools.TTLCache(maxsize=10000, ttl=30)
+_token_cache_lock = threading.Lock()
+
 class LoginRequest(BaseModel):
     username: str
     password: str
@@ -24,13 +37,19 @@ def create_access_token(data: dict, expires_delta: timedelta = timedelta(minutes
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + expires_delta
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, JWT_SECRET_KEY, algorithm="HS256")
+    encoded_jwt = jwt.encode(to_encode, _HS256_KEY, algorithm="HS256")
     return encoded_jwt
 
 
 def get_current_user(
+    request: Request,
     credentials: HTTPAuthorizationCredentials = Depends(security),
 ):
+    # Router-level and handler-level dependencies share one verification per request.
+    cached_user = getattr(request.state, "user", None)
+    if cached_user is not None:
+        return cached_user
+
     if credentials is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -38,8 +57,22 @@ def get_current_user(
         )
 
     token = credentials.credentials
+    cache_key = hashlib.sha256(token.encode()).digest()
+    with _token_cache_lock:
+        cached = _token_cache.get(cache_key)
+    if cached is not None:
+        username, expires_at = cached
+        if expires_at > time.time():
+            request.state.user = username
+            return username
+
     try:
-        payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=["HS256"])
+        payload = jwt.decode(
+            token,
+            _HS256_KEY,
+            algorithms=_JWT_ALGORITHMS,
+            options={"require": ["exp", "sub"]},
+        )
     except ExpiredSignatureError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -57,6 +90,10 @@ def get_current_user(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid token payload",
         )
+
+    with _token_cache_lock:
+        _token_cache[cache_key] = (username, payload["exp"])
+    request.state.user = username
     return username
 
 @router.post("/login")
@@ -7,19 +7,22 @@ from app.services.persistence import (
     get_recent_status_events,
     get_status_events_after_rowid,
     get_document_status_history,
-    insert_document_metadata,
+    insert_documents_metadata,
     list_documents as list_documents_db,
 )
 from app.services.queue_worker import (
     add_document_to_queue,
     document_queue,
-    get_queue_snapshot,
+    has_queue_capacity,
     is_currently_processing,
+    is_queued,
     remove_document_from_queue,
 )
 import app.services.queue_worker as queue_worker
+from app.services.streaming import status_broadcaster
 from sse_starlette import EventSourceResponse
-import json
+import aiofiles
+import orjson
 import os
 import shutil
 import uuid
@@ -28,8 +31,12 @@ import asyncio
 
 router = APIRouter()
 MAX_FILE_SIZE_BYTES = 10 * 1024 * 1024
-ALLOWED_EXTENSIONS = {".pdf", ".txt"}
-ALLOWED_CONTENT_TYPES = {"application/pdf", "text/plain"}
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+ALLOWED_EXTENSIONS = frozenset({".pdf", ".txt"})
+ALLOWED_CONTENT_TYPES = frozenset({"application/pdf", "text/plain"})
+SSE_HEARTBEAT_SECONDS = 15
+SSE_BATCH_LIMIT = 200
+_HEARTBEAT_DATA = orjson.dumps({"status": "idle", "message": "stream_alive"}).decode()
 
 
 def _safe_json(value):
@@ -39,12 +46,38 @@ def _safe_json(value):
         return value
     if isinstance(value, str):
         try:
-            return json.loads(value)
+            return orjson.loads(value)
         except Exception:
             return value
     return value
 
 
+def _status_event_payload(event):
+    payload = {
+        "document_id": event["document_id"],
+        "status": event["status"],
+        "timestamp": event["timestamp"],
+        "metadata": _safe_json(event["metadata"]),
+        "error_message": event["error_message"],
+    }
+
+    if event["analysis_document_id"] is not None:
+        payload["result"] = {
+            "summary": event["summary"],
+            "key_topics": _safe_json(event["key_topics"]) or [],
+            "sentiment": event["sentiment"],
+            "actionable_items": _safe_json(event["actionable_items"]) or [],
+        }
+    return payload
+
+
+def _remove_document_files(stored_path, document_dir):
+    if stored_path and os.path.exists(stored_path):
+        os.remove(stored_path)
+    if os.path.isdir(document_dir):
+        shutil.rmtree(document_dir, ignore_errors=True)
+
+
 @router.post("/upload")
 async def upload_document(
     files: list[UploadFile] = File(...),
@@ -53,14 +86,14 @@ async def upload_document(
     if not files:
         raise HTTPException(status_code=400, detail="No files provided.")
 
-    os.makedirs(UPLOADS_DIR, exist_ok=True)
-
     uploaded_documents = []
+    pending_rows = []
     errors = []
 
     for file in files:
-        document_id = str(uuid.uuid4())
-        filename = os.path.basename(file.filename or "")
+        document_id = uuid.uuid4().hex
+        # Strip any client-side directory, POSIX or Windows style.
+        filename = (file.filename or "").rsplit("/", 1)[-1].rsplit("\\", 1)[-1]
         content_type = file.content_type
 
         try:
@@ -68,7 +101,8 @@ async def upload_document(
                 errors.append({"filename": file.filename, "error": "Filename is missing or invalid."})
                 continue
 
-            ext = os.path.splitext(filename)[1].lower()
+            stem, _, suffix = filename.rpartition(".")
+            ext = "." + suffix.lower() if stem else ""
             if ext not in ALLOWED_EXTENSIONS:
                 errors.append(
                     {
@@ -87,35 +121,34 @@ async def upload_document(
                 )
                 continue
 
-            file_bytes = await file.read()
-            file_size = len(file_bytes)
-            if file_size > MAX_FILE_SIZE_BYTES:
-                errors.append(
-                    {
-                        "filename": filename,
-                        "error": "File exceeds max size of 10MB.",
-                    }
-                )
+            size_error = {
+                "filename": filename,
+                "error": "File exceeds max size of 10MB.",
+            }
+            if file.size is not None and file.size > MAX_FILE_SIZE_BYTES:
+                errors.append(size_error)
                 continue
 
             document_upload_dir = os.path.join(UPLOADS_DIR, document_id)
-            os.makedirs(document_upload_dir, exist_ok=True)
+            await asyncio.to_thread(os.mkdir, document_upload_dir)
             file_path = os.path.join(document_upload_dir, filename)
 
-            with open(file_path, "wb") as f:
-                f.write(file_bytes)
-
-            insert_document_metadata(
-                document_id,
-                owner_username=current_user,
-                original_filename=filename,
-                stored_path=file_path,
-                content_type=content_type,
-                size_bytes=file_size,
-                status="pending",
-            )
+            file_size = 0
+            async with aiofiles.open(file_path, "wb") as out:
+                while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                    file_size += len(chunk)
+                    if file_size > MAX_FILE_SIZE_BYTES:
+                        break
+                    await out.write(chunk)
 
-            await add_document_to_queue(document_id)
+            if file_size > MAX_FILE_SIZE_BYTES:
+                await asyncio.to_thread(shutil.rmtree, document_upload_dir, ignore_errors=True)
+                errors.append(size_error)
+                continue
+
+            pending_rows.append(
+                (document_id, current_user, filename, file_path, content_type, file_size, "pending")
+            )
             uploaded_documents.append(
                 {
                     "document_id": document_id,
@@ -130,6 +163,39 @@ async def upload_document(
         except Exception as e:
             errors.append({"filename": filename, "error": str(e)})
 
+    # Refuse the batch before committing anything if the queue cannot take
+    # it; otherwise rows would be stored that no worker will ever pick up.
+    if pending_rows and not has_queue_capacity(len(pending_rows)):
+        for document in uploaded_documents:
+            await asyncio.to_thread(
+                shutil.rmtree,
+                os.path.dirname(document["stored_path"]),
+                ignore_errors=True,
+            )
+        raise HTTPException(
+            status_code=503,
+            detail="Processing queue is full. Try again later.",
+        )
+
+    # One transaction for the whole batch, then enqueue once rows are visible
+    # to the worker. Nothing below awaits a suspension point between the
+    # capacity check and the last enqueue, so the check cannot go stale.
+    if pending_rows:
+        try:
+            insert_documents_metadata(pending_rows)
+        except Exception as e:
+            for document in uploaded_documents:
+                errors.append({"filename": document["filename"], "error": str(e)})
+                await asyncio.to_thread(
+                    shutil.rmtree,
+                    os.path.dirname(document["stored_path"]),
+                    ignore_errors=True,
+                )
+            uploaded_documents = []
+        else:
+            for document in uploaded_documents:
+                await add_document_to_queue(document["document_id"])
+
     if not uploaded_documents:
         raise HTTPException(
             status_code=400,
@@ -158,7 +224,7 @@ async def list_documents(
         )
 
     docs = list_documents_db(owner_username=current_user, status_filter=status)
-    return {"documents": [dict(row) for row in docs]}
+    return {"documents": docs}
 
 
 @router.get("/documents/stream")
@@ -168,35 +234,16 @@ async def stream_documents(
 ):
     async def event_generator():
         last_rowid = 0
+        # Subscribe before the backfill so transitions recorded in between still wake us.
+        wakeup = status_broadcaster.subscribe(current_user)
 
         try:
             recent_events = get_recent_status_events(limit=50, owner_username=current_user)
             for event in recent_events:
                 last_rowid = int(event["row_num"])
-                payload = {
-                    "document_id": event["document_id"],
-                    "status": event["status"],
-                    "timestamp": event["timestamp"],
-                    "metadata": _safe_json(event["metadata"]),
-                    "error_message": event["error_message"],
-                }
-
-                if event["status"] == "completed":
-                    analysis = get_document_analysis_result(
-                        event["document_id"],
-                        owner_username=current_user,
-                    )
-                    if analysis:
-                        payload["result"] = {
-                            "summary": analysis["summary"],
-                            "key_topics": _safe_json(analysis["key_topics"]) or [],
-                            "sentiment": analysis["sentiment"],
-                            "actionable_items": _safe_json(analysis["actionable_items"]) or [],
-                        }
-
                 yield {
                     "event": "status",
-                    "data": json.dumps(payload),
+                    "data": orjson.dumps(_status_event_payload(event)).decode(),
                 }
 
             while True:
@@ -204,48 +251,35 @@ async def stream_documents(
                     print("SSE client disconnected, closing stream.")
                     break
 
-                new_events = get_status_events_after_rowid(
-                    last_rowid,
-                    limit=200,
-                    owner_username=current_user,
-                )
-                if not new_events:
+                try:
+                    await asyncio.wait_for(wakeup.wait(), timeout=SSE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
                     yield {
                         "event": "heartbeat",
-                        "data": json.dumps({"status": "idle", "message": "stream_alive"}),
+                        "data": _HEARTBEAT_DATA,
                     }
-                    await asyncio.sleep(1)
                     continue
+                wakeup.clear()
 
+                new_events = get_status_events_after_rowid(
+                    last_rowid,
+                    limit=SSE_BATCH_LIMIT,
+                    owner_username=current_user,
+                )
                 for event in new_events:
                     last_rowid = int(event["row_num"])
-                    payload = {
-                        "document_id": event["document_id"],
-                        "status": event["status"],
-                        "timestamp": event["timestamp"],
-                        "metadata": _safe_json(event["metadata"]),
-                        "error_message": event["error_message"],
+                    yield {
+                        "event": "status",
+                        "data": orjson.dumps(_status_event_payload(event)).decode(),
                     }
-
-                    if event["status"] == "completed":
-                        analysis = get_document_analysis_result(
-                            event["document_id"],
-                            owner_username=current_user,
-                        )
-                        if analysis:
-                            payload["result"] = {
-                                "summary": analysis["summary"],
-                                "key_topics": _safe_json(analysis["key_topics"]) or [],
-                                "sentiment": analysis["sentiment"],
-                                "actionable_items": _safe_json(analysis["actionable_items"]) or [],
-                            }
-
-                    yield {"event": "status", "data": json.dumps(payload)}
-                await asyncio.sleep(1)
+                if len(new_events) == SSE_BATCH_LIMIT:
+                    # More rows may be waiting; drain them before sleeping again.
+                    wakeup.set()
         except asyncio.CancelledError:
             print("SSE stream cancelled by client.")
             raise
         finally:
+            status_broadcaster.unsubscribe(wakeup)
             print("SSE stream cleanup complete.")
 
     return EventSourceResponse(event_generator())
@@ -262,7 +296,7 @@ async def get_document(id: str, current_user: str = Depends(get_current_user)):
 
     return {
         "document": dict(document),
-        "status_history": [dict(event) for event in status_history],
+        "status_history": status_history,
         "analysis_result": dict(analysis) if analysis else None,
     }
 
@@ -273,7 +307,7 @@ async def get_document_status(id: str, current_user: str = Depends(get_current_u
     if not document:
         raise HTTPException(status_code=404, detail="Document not found.")
 
-    queued = id in get_queue_snapshot()
+    queued = is_queued(id)
     processing = is_currently_processing(id)
     return {
         "document_id": id,
@@ -297,12 +331,10 @@ async def delete_document(id: str, current_user: str = Depends(get_current_user)
     if not deleted:
         raise HTTPException(status_code=404, detail="Document not found.")
 
-    stored_path = deleted["stored_path"]
-    if stored_path and os.path.exists(stored_path):
-        os.remove(stored_path)
-
-    document_dir = os.path.join(UPLOADS_DIR, id)
-    if os.path.isdir(document_dir):
-        shutil.rmtree(document_dir, ignore_errors=True)
+    await asyncio.to_thread(
+        _remove_document_files,
+        deleted["stored_path"],
+        os.path.join(UPLOADS_DIR, id),
+    )
 
     return {"message": "Document and associated data removed.", "document_id": id}
@@ -1,12 +1,46 @@
+import mmap
 import os
 
-from pdfminer.high_level import extract_text as extract_pdf_text
+import pypdfium2 as pdfium
+from pdfminer.high_level import extract_text as extract_pdfminer_text
 
 
 class ExtractionError(Exception):
     pass
 
 
+def _extract_pdf_text(stored_path: str) -> str:
+    try:
+        pdf = pdfium.PdfDocument(stored_path)
+    except pdfium.PdfiumError:
+        # PDFium rejects some malformed files that pdfminer can still read.
+        return extract_pdfminer_text(stored_path)
+
+    # Close handles eagerly so native PDFium memory isn't held until finalizers run.
+    try:
+        pages = []
+        for page in pdf:
+            textpage = page.get_textpage()
+            try:
+                # PDFium ends lines with \r\n; pdfminer and text uploads use \n.
+                pages.append(textpage.get_text_bounded().replace("\r\n", "\n"))
+            finally:
+                textpage.close()
+                page.close()
+        return "\n".join(pages)
+    finally:
+        pdf.close()
+
+
+def _read_text_file(stored_path: str) -> str:
+    # Decode straight from the page cache instead of through a buffered read.
+    with open(stored_path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return ""
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return str(mapped, "utf-8", "replace")
+
+
 def extract_text_from_document(stored_path: str, content_type: str | None = None) -> str:
     if not stored_path or not os.path.exists(stored_path):
         raise ExtractionError("Stored file path is missing or file does not exist.")
@@ -17,10 +51,9 @@ def extract_text_from_document(stored_path: str, content_type: str | None = None
 
     try:
         if is_txt:
-            with open(stored_path, "r", encoding="utf-8", errors="replace") as f:
-                text = f.read()
+            text = _read_text_file(stored_path)
         elif is_pdf:
-            text = extract_pdf_text(stored_path)
+            text = _extract_pdf_text(stored_path)
         else:
             raise ExtractionError("Unsupported document type for extraction.")
     except Exception as e:
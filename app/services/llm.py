@@ -1,13 +1,27 @@
+import asyncio
+import hashlib
 import json
 import re
-import time
-
-from openai import APIConnectionError, APIError, APITimeoutError, OpenAI, RateLimitError
+import threading
+
+import cachetools
+import httpx
+from openai import (
+    APIConnectionError,
+    APIError,
+    APITimeoutError,
+    AsyncOpenAI,
+    DefaultAsyncHttpxClient,
+    RateLimitError,
+)
 from app.config import OPENAI_API_KEY
 
 
 OPENAI_MODEL = "gpt-4.1"
 MAX_TEXT_CHARS = 20000
+WORD_BOUNDARY_WINDOW = 200
+MAX_CONNECTIONS = 50
+_SENTENCE_SPLIT = re.compile(r"[.!?]+")
 _client = None
 
 
@@ -15,36 +29,55 @@ class LLMError(Exception):
     pass
 
 
+_PROMPT_HEADER = (
+    "Analyze the document text and return ONLY valid JSON with this exact shape:\n"
+    "{\n"
+    '  "summary": "3-5 sentence concise summary",\n'
+    '  "key_topics": ["topic1", "topic2"],\n'
+    '  "sentiment": "positive|negative|neutral|mixed",\n'
+    '  "actionable_items": ["item1", "item2"]\n'
+    "}\n\n"
+    "Rules:\n"
+    "- summary must be 3-5 sentences.\n"
+    "- key_topics and actionable_items must be arrays of strings.\n"
+    "- sentiment must be exactly one of: positive, negative, neutral, mixed.\n"
+    "- If no actionable items are present, return an empty array.\n\n"
+    "Document text:\n"
+)
+
+# Validated analyses keyed by SHA-256 of the prompt, so a re-upload of the
+# same text skips the API call. raw_model_output is not cached.
+_result_cache = cachetools.LRUCache(maxsize=512)
+_result_cache_lock = threading.Lock()
+
+
 def _build_prompt(document_text: str) -> str:
-    trimmed_text = document_text[:MAX_TEXT_CHARS]
-    return (
-        "Analyze the document text and return ONLY valid JSON with this exact shape:\n"
-        "{\n"
-        '  "summary": "3-5 sentence concise summary",\n'
-        '  "key_topics": ["topic1", "topic2"],\n'
-        '  "sentiment": "positive|negative|neutral|mixed",\n'
-        '  "actionable_items": ["item1", "item2"]\n'
-        "}\n\n"
-        "Rules:\n"
-        "- summary must be 3-5 sentences.\n"
-        "- key_topics and actionable_items must be arrays of strings.\n"
-        "- sentiment must be exactly one of: positive, negative, neutral, mixed.\n"
-        "- If no actionable items are present, return an empty array.\n\n"
-        "Document text:\n"
-        f"{trimmed_text}"
-    )
-
-
-def _get_client() -> OpenAI:
+    if len(document_text) <= MAX_TEXT_CHARS:
+        return _PROMPT_HEADER + document_text
+
+    # Cut on a word boundary so no tokens are spent on a trailing fragment,
+    # but only look back a short way: text with few spaces (e.g. CJK) would
+    # otherwise be cut to almost nothing.
+    cut = document_text.rfind(" ", MAX_TEXT_CHARS - WORD_BOUNDARY_WINDOW, MAX_TEXT_CHARS)
+    if cut == -1:
+        cut = MAX_TEXT_CHARS
+    return _PROMPT_HEADER + document_text[:cut]
+
+
+def _get_client() -> AsyncOpenAI:
     global _client
     if _client is None:
-        _client = OpenAI(api_key=OPENAI_API_KEY)
+        _client = AsyncOpenAI(
+            api_key=OPENAI_API_KEY,
+            http_client=DefaultAsyncHttpxClient(
+                limits=httpx.Limits(max_connections=MAX_CONNECTIONS),
+            ),
+        )
     return _client
 
 
 def _count_sentences(text: str) -> int:
-    parts = re.split(r"[.!?]+", text)
-    return len([p for p in parts if p.strip()])
+    return sum(1 for part in _SENTENCE_SPLIT.split(text) if part.strip())
 
 
 def _normalize_string_list(value) -> list[str]:
@@ -53,12 +86,12 @@ def _normalize_string_list(value) -> list[str]:
     return []
 
 
-def _call_openai_chat_completions(prompt: str) -> dict:
+async def _call_openai_chat_completions(prompt: str) -> dict:
     if not OPENAI_API_KEY:
         raise LLMError("OPENAI_API_KEY is not configured.")
 
     try:
-        completion = _get_client().chat.completions.create(
+        completion = await _get_client().chat.completions.create(
             model=OPENAI_MODEL,
             messages=[
                 {
@@ -98,23 +131,34 @@ def _call_openai_chat_completions(prompt: str) -> dict:
         "key_topics": _normalize_string_list(parsed.get("key_topics", [])),
         "sentiment": sentiment,
         "actionable_items": _normalize_string_list(parsed.get("actionable_items", [])),
-        "raw_model_output": completion.model_dump(),
+        "raw_model_output": completion.to_json(indent=None),
     }
     return result
 
 
-def analyze_document_with_retry(document_text: str, max_retries: int = 1) -> dict:
+async def analyze_document_with_retry(document_text: str, max_retries: int = 1) -> dict:
     attempts = max_retries + 1
     last_error = None
     prompt = _build_prompt(document_text)
+    cache_key = hashlib.sha256(prompt.encode()).hexdigest()
+
+    with _result_cache_lock:
+        cached = _result_cache.get(cache_key)
+    if cached is not None:
+        return {**cached, "raw_model_output": None}
 
     for attempt in range(attempts):
         try:
-            return _call_openai_chat_completions(prompt)
+            result = await _call_openai_chat_completions(prompt)
+            with _result_cache_lock:
+                _result_cache[cache_key] = {
+                    key: value for key, value in result.items() if key != "raw_model_output"
+                }
+            return result
         except LLMError as e:
             last_error = e
             if attempt < attempts - 1:
-                time.sleep(1)
+                await asyncio.sleep(1)
             else:
                 break
 
@@ -1,63 +1,332 @@
+import random
 import sqlite3
+import threading
+import time
+from contextlib import closing, contextmanager
 from app.config import DB_PATH
+import cachetools
 import uuid
 
+# One long-lived connection per thread keeps SQLite's page cache warm and
+# avoids reopening the database file (and re-parsing the schema) per call.
+_local = threading.local()
+_open_connections = []
+_open_connections_lock = threading.Lock()
+_connection_generation = 0
+FETCH_CHUNK_SIZE = 512
+_initialized_db_paths = set()
+# PRAGMA user_version once legacy text timestamps have been converted.
+_SCHEMA_VERSION_EPOCH_TIMESTAMPS = 1
+
+# Ownership never changes after insert, so document_id -> owner_username is
+# cached for owner-scoped reads. Only found owners are cached; a miss always
+# goes back to the database.
+_owner_cache = cachetools.LRUCache(maxsize=4096)
+_owner_cache_lock = threading.Lock()
+
+# WAL lets SSE readers proceed while the worker commits, and with
+# synchronous=NORMAL a commit appends to the WAL without an fsync.
+_CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA cache_size=-64000",
+)
+
+
 def get_db_connection():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row  
+    conn = getattr(_local, "conn", None)
+    if (
+        conn is None
+        or _local.db_path != DB_PATH
+        or _local.generation != _connection_generation
+    ):
+        # uri=True lets DB_PATH be a "file:" URI (e.g. a shared in-memory
+        # database in tests); plain paths are opened as before.
+        conn = sqlite3.connect(
+            DB_PATH,
+            check_same_thread=False,
+            isolation_level=None,
+            cached_statements=256,
+            uri=True,
+        )
+        conn.row_factory = sqlite3.Row
+        for pragma in _CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        with _open_connections_lock:
+            _open_connections.append(conn)
+        _local.conn = conn
+        _local.db_path = DB_PATH
+        _local.generation = _connection_generation
     return conn
 
-def create_tables():
+
+def close_db_connections():
+    global _connection_generation
+    with _open_connections_lock:
+        for conn in _open_connections:
+            conn.close()
+        _open_connections.clear()
+        _connection_generation += 1
+
+@contextmanager
+def _transaction():
+    # Connections run in autocommit mode; grouping writes under one
+    # BEGIN IMMEDIATE makes them a single commit and takes the write lock
+    # up front instead of failing with SQLITE_BUSY mid-transaction.
     conn = get_db_connection()
     cursor = conn.cursor()
+    cursor.execute("BEGIN IMMEDIATE")
+    try:
+        yield cursor
+        cursor.execute("COMMIT")
+    except BaseException:
+        # A failed COMMIT (e.g. SQLITE_BUSY) leaves the transaction open and
+        # must be rolled back too; SQLite may already have ended it on its own.
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        cursor.close()
 
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS documents (
-        document_id TEXT PRIMARY KEY, 
-        owner_username TEXT,
-        original_filename TEXT,
-        stored_path TEXT,
-        content_type TEXT,
-        size_bytes INTEGER,
-        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-        current_status TEXT, 
-        error_message TEXT
-    )
-    ''')
-
-    cursor.execute("PRAGMA table_info(documents)")
-    columns = {row[1] for row in cursor.fetchall()}
-    if "owner_username" not in columns:
-        cursor.execute("ALTER TABLE documents ADD COLUMN owner_username TEXT")
-
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS status_events (
-        event_id TEXT PRIMARY KEY,   
-        document_id TEXT,            
-        status TEXT,                 
-        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP, 
-        metadata TEXT,               
-        error_message TEXT,          
-        FOREIGN KEY (document_id) REFERENCES documents(document_id)
+def _uuid7():
+    # Time-ordered (RFC 9562 v7) IDs append at the right edge of the
+    # status_events primary-key index instead of landing at random pages.
+    # Randomness comes from the PRNG: these are row keys, not secrets.
+    unix_ms = time.time_ns() // 1_000_000
+    rand_a = random.getrandbits(12)
+    rand_b = random.getrandbits(62)
+    value = (unix_ms & 0xFFFF_FFFF_FFFF) << 80 | 0x7 << 76 | rand_a << 64 | 0b10 << 62 | rand_b
+    return uuid.UUID(int=value)
+
+def _iter_dicts(cursor, chunk_size=FETCH_CHUNK_SIZE):
+    # Resolve column names once per result set instead of per sqlite3.Row,
+    # and pull rows in chunks rather than materializing the whole result.
+    columns = [column[0] for column in cursor.description]
+    while rows := cursor.fetchmany(chunk_size):
+        for row in rows:
+            yield dict(zip(columns, row))
+
+def create_tables():
+    # Keyed by path so re-pointing DB_PATH (as the tests do) still gets a schema.
+    if DB_PATH in _initialized_db_paths:
+        return
+
+    with _transaction() as cursor:
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS documents (
+            document_id TEXT PRIMARY KEY,
+            owner_username TEXT,
+            original_filename TEXT,
+            stored_path TEXT,
+            content_type TEXT,
+            size_bytes INTEGER,
+            created_at INTEGER DEFAULT (CAST(strftime('%s', 'now') AS INTEGER)),
+            current_status TEXT,
+            error_message TEXT
+        )
+        ''')
+
+        cursor.execute("PRAGMA table_info(documents)")
+        document_columns = {row[1]: row[2] for row in cursor.fetchall()}
+        if "owner_username" not in document_columns:
+            cursor.execute("ALTER TABLE documents ADD COLUMN owner_username TEXT")
+
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS status_events (
+            event_id TEXT PRIMARY KEY,
+            document_id TEXT,
+            status TEXT,
+            timestamp INTEGER DEFAULT (CAST(strftime('%s', 'now') AS INTEGER)),
+            metadata TEXT,
+            error_message TEXT,
+            owner_username TEXT,
+            FOREIGN KEY (document_id) REFERENCES documents(document_id)
+        )
+        ''')
+
+        # owner_username is denormalized onto status_events so the SSE
+        # queries filter a single table instead of joining documents.
+        cursor.execute("PRAGMA table_info(status_events)")
+        event_columns = {row[1]: row[2] for row in cursor.fetchall()}
+        if "owner_username" not in event_columns:
+            cursor.execute("ALTER TABLE status_events ADD COLUMN owner_username TEXT")
+            cursor.execute('''
+            UPDATE status_events
+            SET owner_username = (
+                SELECT d.owner_username FROM documents d WHERE d.document_id = status_events.document_id
+            )
+            ''')
+
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS analysis_results (
+            document_id TEXT PRIMARY KEY,
+            summary TEXT,
+            key_topics TEXT,
+            sentiment TEXT,
+            actionable_items TEXT,
+            raw_model_output TEXT,
+            FOREIGN KEY (document_id) REFERENCES documents(document_id)
+        )
+        ''')
+
+        # Timestamps are stored as Unix-epoch integers rather than ISO-8601
+        # TEXT: narrower rows and index entries, and integer comparisons when
+        # ordering history. Older databases declared CURRENT_TIMESTAMP text
+        # defaults; their rows are converted here, and the INSERT statements
+        # always pass the time explicitly so the old default is never used.
+        # Only tables created with the old DATETIME declaration can hold text
+        # rows, and the declaration survives conversion, so user_version
+        # records that the full-table rewrite has already been done.
+        cursor.execute("PRAGMA user_version")
+        schema_version = cursor.fetchone()[0]
+        legacy_timestamps = (
+            document_columns["created_at"] == "DATETIME"
+            or event_columns["timestamp"] == "DATETIME"
+        )
+        if legacy_timestamps and schema_version < _SCHEMA_VERSION_EPOCH_TIMESTAMPS:
+            cursor.execute(
+                "UPDATE documents SET created_at = CAST(strftime('%s', created_at) AS INTEGER) "
+                "WHERE typeof(created_at) = 'text'"
+            )
+            cursor.execute(
+                "UPDATE status_events SET timestamp = CAST(strftime('%s', timestamp) AS INTEGER) "
+                "WHERE typeof(timestamp) = 'text'"
+            )
+            cursor.execute(f"PRAGMA user_version = {_SCHEMA_VERSION_EPOCH_TIMESTAMPS}")
+
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'index'")
+        existing_indexes = {row[0] for row in cursor.fetchall()}
+        indexes = {
+            "idx_status_events_document_ts": "status_events(document_id, timestamp)",
+            "idx_documents_owner": "documents(owner_username)",
+            "idx_status_events_owner": "status_events(owner_username)",
+        }
+        missing_indexes = indexes.keys() - existing_indexes
+        for name in sorted(missing_indexes):
+            cursor.execute(f"CREATE INDEX {name} ON {indexes[name]}")
+
+        # documents.current_status mirrors the latest event. Maintaining it in
+        # a trigger keeps list filtering cheap without a second statement per
+        # transition from Python.
+        cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_status_events_current_status
+        AFTER INSERT ON status_events
+        BEGIN
+            UPDATE documents
+            SET current_status = NEW.status, error_message = NEW.error_message
+            WHERE document_id = NEW.document_id;
+        END
+        ''')
+        # Cascade document deletes inside SQLite. A trigger is used instead of
+        # ON DELETE CASCADE because existing databases would need their tables
+        # rebuilt, and PRAGMA foreign_keys=ON would also reject the "failed"
+        # event the worker records for a document id that no longer exists.
+        cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_documents_cascade_delete
+        AFTER DELETE ON documents
+        BEGIN
+            DELETE FROM status_events WHERE document_id = OLD.document_id;
+            DELETE FROM analysis_results WHERE document_id = OLD.document_id;
+        END
+        ''')
+        # Planner statistics only need a refresh when an index is new; running
+        # ANALYZE on every boot would rescan every table.
+        if missing_indexes:
+            cursor.execute("ANALYZE")
+
+    _initialized_db_paths.add(DB_PATH)
+
+create_tables()
+
+# Hot-path statements are module constants so every call hands sqlite3 the
+# same string and hits the connection's prepared-statement cache.
+_SQL_NOW_EPOCH = "CAST(strftime('%s', 'now') AS INTEGER)"
+_SQL_INSERT_DOCUMENT = f'''
+    INSERT INTO documents (
+        document_id,
+        owner_username,
+        original_filename,
+        stored_path,
+        content_type,
+        size_bytes,
+        current_status,
+        error_message,
+        created_at
     )
-    ''')
-
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS analysis_results (
-        document_id TEXT PRIMARY KEY, 
-        summary TEXT,                 
-        key_topics TEXT,              
-        sentiment TEXT,               
-        actionable_items TEXT,        
-        raw_model_output TEXT,        
-        FOREIGN KEY (document_id) REFERENCES documents(document_id)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, {_SQL_NOW_EPOCH})
+'''
+_SQL_INSERT_PENDING_DOCUMENT = f'''
+    INSERT INTO documents (
+        document_id,
+        owner_username,
+        original_filename,
+        stored_path,
+        content_type,
+        size_bytes,
+        current_status,
+        created_at
     )
-    ''')
+    VALUES (?, ?, ?, ?, ?, ?, ?, {_SQL_NOW_EPOCH})
+'''
+_SQL_INSERT_STATUS_EVENT = f'''
+    INSERT INTO status_events (event_id, document_id, status, metadata, error_message, owner_username, timestamp)
+    VALUES (?, ?, ?, ?, ?, (SELECT owner_username FROM documents WHERE document_id = ?), {_SQL_NOW_EPOCH})
+'''
+_SQL_UPSERT_ANALYSIS_RESULT = '''
+    INSERT INTO analysis_results (document_id, summary, key_topics, sentiment, actionable_items, raw_model_output)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT(document_id) DO UPDATE SET
+        summary = excluded.summary,
+        key_topics = excluded.key_topics,
+        sentiment = excluded.sentiment,
+        actionable_items = excluded.actionable_items,
+        raw_model_output = excluded.raw_model_output
+'''
+# Readers format the epoch columns back to "YYYY-MM-DD HH:MM:SS" so API
+# responses keep the CURRENT_TIMESTAMP shape.
+_DOCUMENT_COLUMNS = (
+    "document_id, owner_username, original_filename, stored_path, content_type, size_bytes, "
+    "datetime(created_at, 'unixepoch') AS created_at, current_status, error_message"
+)
+_SQL_GET_DOCUMENT = f'SELECT {_DOCUMENT_COLUMNS} FROM documents WHERE document_id = ?'
+_SQL_GET_OWNED_DOCUMENT = f'SELECT {_DOCUMENT_COLUMNS} FROM documents WHERE document_id = ? AND owner_username = ?'
+_SQL_GET_DOCUMENT_OWNER = 'SELECT owner_username FROM documents WHERE document_id = ?'
+_SQL_GET_STATUS_HISTORY = '''
+    SELECT
+        event_id,
+        document_id,
+        status,
+        datetime(timestamp, 'unixepoch') AS timestamp,
+        metadata,
+        error_message,
+        owner_username
+    FROM status_events
+    WHERE document_id = ?
+    ORDER BY status_events.timestamp ASC, rowid ASC
+'''
+_SQL_GET_ANALYSIS_RESULT = 'SELECT * FROM analysis_results WHERE document_id = ?'
+_SQL_DELETE_DOCUMENT = 'DELETE FROM documents WHERE document_id = ?'
 
-    conn.commit()
-    conn.close()
+def _owner_of(document_id):
+    with _owner_cache_lock:
+        owner_username = _owner_cache.get(document_id)
+    if owner_username is not None:
+        return owner_username
 
-create_tables()
+    with closing(get_db_connection().cursor()) as cursor:
+        cursor.execute(_SQL_GET_DOCUMENT_OWNER, (document_id,))
+        row = cursor.fetchone()
+    if row is None or row[0] is None:
+        return None
+    with _owner_cache_lock:
+        _owner_cache[document_id] = row[0]
+    return row[0]
+
+def _forget_owner(document_id):
+    with _owner_cache_lock:
+        _owner_cache.pop(document_id, None)
 
 def insert_document_metadata(
     document_id,
@@ -69,255 +338,190 @@ def insert_document_metadata(
     status='pending',
     error_message=None,
 ):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute('''
-        INSERT INTO documents (
-            document_id,
-            owner_username,
-            original_filename,
-            stored_path,
-            content_type,
-            size_bytes,
-            current_status,
-            error_message
-        )
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-    ''', (document_id, owner_username, original_filename, stored_path, content_type, size_bytes, status, error_message))
-    conn.commit()
-    conn.close()
+    with _transaction() as cursor:
+        cursor.execute(_SQL_INSERT_DOCUMENT, (document_id, owner_username, original_filename, stored_path, content_type, size_bytes, status, error_message))
+
+def insert_documents_metadata(rows):
+    with _transaction() as cursor:
+        cursor.executemany(_SQL_INSERT_PENDING_DOCUMENT, rows)
+
+def insert_status_events(document_id, events):
+    # events: (status, metadata, error_message) tuples, oldest first, written
+    # in one transaction; the trigger leaves current_status at the last one.
+    rows = [
+        (str(_uuid7()), document_id, status, metadata, error_message, document_id)
+        for status, metadata, error_message in events
+    ]
+    if not rows:
+        return
+    with _transaction() as cursor:
+        cursor.executemany(_SQL_INSERT_STATUS_EVENT, rows)
 
 def insert_status_event(document_id, status, metadata=None, error_message=None):
-    event_id = str(uuid.uuid4())
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute('''
-        INSERT INTO status_events (event_id, document_id, status, metadata, error_message)
-        VALUES (?, ?, ?, ?, ?)
-    ''', (event_id, document_id, status, metadata, error_message))
-    cursor.execute(
-        '''
-        UPDATE documents
-        SET current_status = ?, error_message = ?
-        WHERE document_id = ?
-        ''',
-        (status, error_message, document_id),
-    )
-    conn.commit()
-    conn.close()
+    insert_status_events(document_id, [(status, metadata, error_message)])
+
+def fetch_and_mark_processing(document_id, metadata=None):
+    # Existence check and the "processing" transition share one transaction.
+    with _transaction() as cursor:
+        cursor.execute(_SQL_GET_DOCUMENT, (document_id,))
+        document = cursor.fetchone()
+        if document is not None:
+            cursor.execute(
+                _SQL_INSERT_STATUS_EVENT,
+                (str(_uuid7()), document_id, "processing", metadata, None, document_id),
+            )
+    return document
 
 def insert_analysis_result(document_id, summary, key_topics, sentiment, actionable_items, raw_model_output=None):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        '''
-        INSERT INTO analysis_results (document_id, summary, key_topics, sentiment, actionable_items, raw_model_output)
-        VALUES (?, ?, ?, ?, ?, ?)
-        ON CONFLICT(document_id) DO UPDATE SET
-            summary = excluded.summary,
-            key_topics = excluded.key_topics,
-            sentiment = excluded.sentiment,
-            actionable_items = excluded.actionable_items,
-            raw_model_output = excluded.raw_model_output
-        ''',
-        (document_id, summary, key_topics, sentiment, actionable_items, raw_model_output),
-    )
-    conn.commit()
-    conn.close()
+    with _transaction() as cursor:
+        cursor.execute(
+            _SQL_UPSERT_ANALYSIS_RESULT,
+            (document_id, summary, key_topics, sentiment, actionable_items, raw_model_output),
+        )
 
 def get_document_by_id(document_id, owner_username=None):
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
+    with closing(get_db_connection().cursor()) as cursor:
         if owner_username is None:
-            cursor.execute('SELECT * FROM documents WHERE document_id = ?', (document_id,))
+            cursor.execute(_SQL_GET_DOCUMENT, (document_id,))
         else:
-            cursor.execute(
-                'SELECT * FROM documents WHERE document_id = ? AND owner_username = ?',
-                (document_id, owner_username),
-            )
-        document = cursor.fetchone()
-    return document
+            cursor.execute(_SQL_GET_OWNED_DOCUMENT, (document_id, owner_username))
+        return cursor.fetchone()
+
+def iter_document_status_history(document_id, owner_username=None):
+    if owner_username is not None and _owner_of(document_id) != owner_username:
+        return
+    with closing(get_db_connection().cursor()) as cursor:
+        cursor.execute(_SQL_GET_STATUS_HISTORY, (document_id,))
+        yield from _iter_dicts(cursor)
 
 def get_document_status_history(document_id, owner_username=None):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    if owner_username is None:
-        cursor.execute(
-            'SELECT * FROM status_events WHERE document_id = ? ORDER BY timestamp ASC',
-            (document_id,),
-        )
-    else:
-        cursor.execute(
-            '''
-            SELECT se.*
-            FROM status_events se
-            JOIN documents d ON d.document_id = se.document_id
-            WHERE se.document_id = ? AND d.owner_username = ?
-            ORDER BY se.timestamp ASC
-            ''',
-            (document_id, owner_username),
-        )
-    status_history = cursor.fetchall()
-    conn.close()
-    return status_history
+    return list(iter_document_status_history(document_id, owner_username))
 
 def get_document_analysis_result(document_id, owner_username=None):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    if owner_username is None:
-        cursor.execute('SELECT * FROM analysis_results WHERE document_id = ?', (document_id,))
-    else:
-        cursor.execute(
-            '''
-            SELECT ar.*
-            FROM analysis_results ar
-            JOIN documents d ON d.document_id = ar.document_id
-            WHERE ar.document_id = ? AND d.owner_username = ?
-            ''',
-            (document_id, owner_username),
-        )
-    analysis_result = cursor.fetchone()
-    conn.close()
-    return analysis_result
+    if owner_username is not None and _owner_of(document_id) != owner_username:
+        return None
+    with closing(get_db_connection().cursor()) as cursor:
+        cursor.execute(_SQL_GET_ANALYSIS_RESULT, (document_id,))
+        return cursor.fetchone()
 
 
-def list_documents(owner_username=None, status_filter=None):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    query = (
-        '''
-        SELECT document_id, owner_username, original_filename, stored_path, content_type, size_bytes, created_at, current_status, error_message
-        FROM documents
-        '''
-    )
-    conditions = []
-    params = []
+_SQL_LIST_DOCUMENTS = f'''
+    SELECT {_DOCUMENT_COLUMNS}
+    FROM documents
+'''
+# rowid follows insertion order, so newest-first needs no sort step and is
+# stable for uploads that share a created_at second. One statement per
+# filter combination, keyed by (owner filter, status filter).
+_SQL_LIST_DOCUMENTS_BY_FILTER = {
+    (False, False): _SQL_LIST_DOCUMENTS + " ORDER BY rowid DESC",
+    (True, False): _SQL_LIST_DOCUMENTS + " WHERE owner_username = ? ORDER BY rowid DESC",
+    (False, True): _SQL_LIST_DOCUMENTS + " WHERE current_status = ? ORDER BY rowid DESC",
+    (True, True): _SQL_LIST_DOCUMENTS + " WHERE owner_username = ? AND current_status = ? ORDER BY rowid DESC",
+}
 
-    if owner_username is not None:
-        conditions.append("owner_username = ?")
-        params.append(owner_username)
-    if status_filter is not None:
-        conditions.append("current_status = ?")
-        params.append(status_filter)
 
-    if conditions:
-        query += " WHERE " + " AND ".join(conditions)
-    query += " ORDER BY created_at DESC"
+def iter_documents(owner_username=None, status_filter=None):
+    query = _SQL_LIST_DOCUMENTS_BY_FILTER[owner_username is not None, status_filter is not None]
+    params = tuple(value for value in (owner_username, status_filter) if value is not None)
 
-    cursor.execute(query, tuple(params))
-    documents = cursor.fetchall()
-    conn.close()
-    return documents
+    with closing(get_db_connection().cursor()) as cursor:
+        cursor.execute(query, params)
+        yield from _iter_dicts(cursor)
+
+
+def list_documents(owner_username=None, status_filter=None):
+    return list(iter_documents(owner_username, status_filter))
 
 
 def delete_document_and_related(document_id, owner_username=None):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    if owner_username is None:
-        cursor.execute('SELECT * FROM documents WHERE document_id = ?', (document_id,))
-    else:
-        cursor.execute(
-            'SELECT * FROM documents WHERE document_id = ? AND owner_username = ?',
-            (document_id, owner_username),
-        )
-    document = cursor.fetchone()
-    if document is None:
-        conn.close()
-        return None
+    with _transaction() as cursor:
+        if owner_username is None:
+            cursor.execute(_SQL_GET_DOCUMENT, (document_id,))
+        else:
+            cursor.execute(_SQL_GET_OWNED_DOCUMENT, (document_id, owner_username))
+        document = cursor.fetchone()
+        if document is None:
+            return None
 
-    cursor.execute('DELETE FROM status_events WHERE document_id = ?', (document_id,))
-    cursor.execute('DELETE FROM analysis_results WHERE document_id = ?', (document_id,))
-    cursor.execute('DELETE FROM documents WHERE document_id = ?', (document_id,))
-    conn.commit()
-    conn.close()
+        # trg_documents_cascade_delete removes the events and analysis.
+        cursor.execute(_SQL_DELETE_DOCUMENT, (document_id,))
+    _forget_owner(document_id)
     return document
 
 
-def get_recent_status_events(limit=50, owner_username=None):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    if owner_username is None:
-        cursor.execute(
-            '''
-            SELECT
-                rowid AS row_num,
-                event_id,
-                document_id,
-                status,
-                timestamp,
-                metadata,
-                error_message
-            FROM status_events
-            ORDER BY rowid DESC
-            LIMIT ?
-            ''',
-            (limit,),
-        )
-    else:
-        cursor.execute(
-            '''
-            SELECT
+# Completed events carry their analysis so SSE consumers don't need a
+# follow-up lookup per event.
+_STATUS_EVENT_COLUMNS = '''
                 se.rowid AS row_num,
                 se.event_id,
                 se.document_id,
                 se.status,
-                se.timestamp,
+                datetime(se.timestamp, 'unixepoch') AS timestamp,
                 se.metadata,
-                se.error_message
-            FROM status_events se
-            JOIN documents d ON d.document_id = se.document_id
-            WHERE d.owner_username = ?
-            ORDER BY se.rowid DESC
-            LIMIT ?
-            ''',
-            (owner_username, limit),
-        )
-    rows = cursor.fetchall()
-    conn.close()
+                se.error_message,
+                ar.document_id AS analysis_document_id,
+                ar.summary,
+                ar.key_topics,
+                ar.sentiment,
+                ar.actionable_items
+'''
+_ANALYSIS_JOIN = '''
+            LEFT JOIN analysis_results ar
+                ON ar.document_id = se.document_id AND se.status = 'completed'
+'''
+
+
+_SQL_RECENT_STATUS_EVENTS = f'''
+    SELECT {_STATUS_EVENT_COLUMNS}
+    FROM status_events se
+    {_ANALYSIS_JOIN}
+    ORDER BY se.rowid DESC
+    LIMIT ?
+'''
+_SQL_RECENT_OWNED_STATUS_EVENTS = f'''
+    SELECT {_STATUS_EVENT_COLUMNS}
+    FROM status_events se
+    {_ANALYSIS_JOIN}
+    WHERE se.owner_username = ?
+    ORDER BY se.rowid DESC
+    LIMIT ?
+'''
+_SQL_STATUS_EVENTS_AFTER_ROWID = f'''
+    SELECT {_STATUS_EVENT_COLUMNS}
+    FROM status_events se
+    {_ANALYSIS_JOIN}
+    WHERE se.rowid > ?
+    ORDER BY se.rowid ASC
+    LIMIT ?
+'''
+_SQL_OWNED_STATUS_EVENTS_AFTER_ROWID = f'''
+    SELECT {_STATUS_EVENT_COLUMNS}
+    FROM status_events se
+    {_ANALYSIS_JOIN}
+    WHERE se.owner_username = ? AND se.rowid > ?
+    ORDER BY se.rowid ASC
+    LIMIT ?
+'''
+
+
+def get_recent_status_events(limit=50, owner_username=None):
+    with closing(get_db_connection().cursor()) as cursor:
+        if owner_username is None:
+            cursor.execute(_SQL_RECENT_STATUS_EVENTS, (limit,))
+        else:
+            cursor.execute(_SQL_RECENT_OWNED_STATUS_EVENTS, (owner_username, limit))
+        rows = cursor.fetchall()
 
     return list(reversed(rows))
 
 
 def get_status_events_after_rowid(last_rowid, limit=200, owner_username=None):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    if owner_username is None:
-        cursor.execute(
-            '''
-            SELECT
-                rowid AS row_num,
-                event_id,
-                document_id,
-                status,
-                timestamp,
-                metadata,
-                error_message
-            FROM status_events
-            WHERE rowid > ?
-            ORDER BY rowid ASC
-            LIMIT ?
-            ''',
-            (last_rowid, limit),
-        )
-    else:
-        cursor.execute(
-            '''
-            SELECT
-                se.rowid AS row_num,
-                se.event_id,
-                se.document_id,
-                se.status,
-                se.timestamp,
-                se.metadata,
-                se.error_message
-            FROM status_events se
-            JOIN documents d ON d.document_id = se.document_id
-            WHERE se.rowid > ? AND d.owner_username = ?
-            ORDER BY se.rowid ASC
-            LIMIT ?
-            ''',
-            (last_rowid, owner_username, limit),
-        )
-    rows = cursor.fetchall()
-    conn.close()
-    return rows
+    with closing(get_db_connection().cursor()) as cursor:
+        if owner_username is None:
+            cursor.execute(_SQL_STATUS_EVENTS_AFTER_ROWID, (last_rowid, limit))
+        else:
+            cursor.execute(
+                _SQL_OWNED_STATUS_EVENTS_AFTER_ROWID,
+                (owner_username, last_rowid, limit),
+            )
+        return cursor.fetchall()
@@ -1,92 +1,193 @@
 import asyncio
-import json
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import orjson
 
 from app.services.extractor import ExtractionError, extract_text_from_document
 from app.services.llm import LLMError, analyze_document_with_retry
-from app.services.persistence import get_document_by_id, insert_analysis_result, insert_status_event
+from app.services.persistence import fetch_and_mark_processing, insert_analysis_result, insert_status_event
+from app.services.streaming import status_broadcaster
+
+logger = logging.getLogger(__name__)
+
+_METADATA_EXTRACTION_STARTED = '{"info": "Text extraction started."}'
+_METADATA_ANALYSIS_STARTED = '{"info": "LLM analysis started."}'
+_METADATA_COMPLETED = '{"info": "Processing completed."}'
+_METADATA_FAILED = '{"info": "Processing failed."}'
 
+MAX_QUEUE_SIZE = 1024
+
+# The bound is enforced at admission (has_queue_capacity) on live entries
+# rather than with Queue(maxsize=...): a blocking put() would park the upload
+# handler after its rows were committed, and tombstoned entries would count
+# against the limit.
 document_queue = asyncio.Queue()
-current_document_id = None
+# Several workers drain the queue concurrently; membership is only touched
+# from the event loop, so plain sets need no lock. Removing a queued document
+# tombstones it in _cancelled_ids (O(1)) and workers skip it on dequeue,
+# rather than scanning the deque.
+_queued_ids: set[str] = set()
+_cancelled_ids: set[str] = set()
+_processing_ids: set[str] = set()
+_extractor_pool = None
+# "spawn" avoids forking a parent that already runs to_thread worker threads.
+_MP_CONTEXT = multiprocessing.get_context("spawn")
+
+
+def _get_extractor_pool() -> ProcessPoolExecutor:
+    # PDF parsing is CPU-bound and holds the GIL, so it runs in worker processes.
+    global _extractor_pool
+    if _extractor_pool is None:
+        _extractor_pool = ProcessPoolExecutor(
+            max_workers=os.cpu_count(),
+            mp_context=_MP_CONTEXT,
+        )
+    return _extractor_pool
+
+
+def start_extractor_pool():
+    _get_extractor_pool()
+
+
+def shutdown_extractor_pool():
+    global _extractor_pool
+    if _extractor_pool is not None:
+        _extractor_pool.shutdown(wait=False, cancel_futures=True)
+        _extractor_pool = None
+
+
+async def _extract_text(stored_path: str, content_type: str | None) -> str:
+    loop = asyncio.get_running_loop()
+    pool = _get_extractor_pool()
+    try:
+        return await loop.run_in_executor(pool, extract_text_from_document, stored_path, content_type)
+    except BrokenProcessPool:
+        # A child died (e.g. PDFium crashing on a hostile PDF), which breaks
+        # the whole pool and every document in flight on it. Replace the
+        # shared pool, then retry this document in a process of its own so a
+        # file that crashes again only takes itself down.
+        if _extractor_pool is pool:
+            shutdown_extractor_pool()
+
+    isolated = ProcessPoolExecutor(max_workers=1, mp_context=_MP_CONTEXT)
+    try:
+        return await loop.run_in_executor(isolated, extract_text_from_document, stored_path, content_type)
+    except BrokenProcessPool:
+        raise ExtractionError("Text extraction process crashed.")
+    finally:
+        isolated.shutdown(wait=False)
+
+
+async def _record_failure(document_id: str, owner_username: str | None, error: Exception):
+    await asyncio.to_thread(
+        insert_status_event,
+        document_id,
+        status="failed",
+        metadata=_METADATA_FAILED,
+        error_message=str(error),
+    )
+    status_broadcaster.publish(owner_username)
+
 
 async def background_worker():
-    global current_document_id
     while True:
         document_id = await document_queue.get()
-        current_document_id = document_id
+        _queued_ids.discard(document_id)
+        if document_id in _cancelled_ids:
+            _cancelled_ids.discard(document_id)
+            document_queue.task_done()
+            continue
+        _processing_ids.add(document_id)
+        owner_username = None
 
         try:
-            print(f"Queue Contents: {list(document_queue._queue)}")
-
-            document = get_document_by_id(document_id)
-            if not document:
-                raise RuntimeError("Document metadata not found in database.")
+            logger.debug("Queue depth: %d", document_queue.qsize())
 
-            insert_status_event(
+            document = await asyncio.to_thread(
+                fetch_and_mark_processing,
                 document_id,
-                status="processing",
-                metadata='{"info": "Text extraction started."}',
+                metadata=_METADATA_EXTRACTION_STARTED,
             )
+            if not document:
+                raise RuntimeError("Document metadata not found in database.")
+            owner_username = document["owner_username"]
+            status_broadcaster.publish(owner_username)
 
             print(f"Processing document {document_id}...")
 
-            extracted_text = extract_text_from_document(
-                stored_path=document["stored_path"],
-                content_type=document["content_type"],
-            )
+            extracted_text = await _extract_text(document["stored_path"], document["content_type"])
 
-            insert_status_event(
+            await asyncio.to_thread(
+                insert_status_event,
                 document_id,
                 status="analyzing",
-                metadata='{"info": "LLM analysis started."}',
+                metadata=_METADATA_ANALYSIS_STARTED,
             )
+            status_broadcaster.publish(owner_username)
 
-            analysis = analyze_document_with_retry(extracted_text, max_retries=1)
-            insert_analysis_result(
+            analysis = await analyze_document_with_retry(extracted_text, max_retries=1)
+            await asyncio.to_thread(
+                insert_analysis_result,
                 document_id=document_id,
                 summary=analysis["summary"],
-                key_topics=json.dumps(analysis["key_topics"]),
+                key_topics=orjson.dumps(analysis["key_topics"]).decode(),
                 sentiment=analysis["sentiment"],
-                actionable_items=json.dumps(analysis["actionable_items"]),
-                raw_model_output=json.dumps(analysis["raw_model_output"]),
+                actionable_items=orjson.dumps(analysis["actionable_items"]).decode(),
+                raw_model_output=analysis["raw_model_output"],
             )
 
-            insert_status_event(
+            await asyncio.to_thread(
+                insert_status_event,
                 document_id,
                 status="completed",
-                metadata='{"info": "Processing completed."}',
+                metadata=_METADATA_COMPLETED,
             )
+            status_broadcaster.publish(owner_username)
             print(f"Document {document_id} processed successfully.")
 
-        except (ExtractionError, LLMError, Exception) as e:
+        except asyncio.CancelledError:
+            # Shutdown: leave the document's status as-is rather than
+            # recording a spurious failure.
+            raise
+        except (ExtractionError, LLMError) as e:
             print(f"Error processing document {document_id}: {e}")
-            insert_status_event(
-                document_id,
-                status="failed",
-                metadata='{"info": "Processing failed."}',
-                error_message=str(e),
-            )
+            await _record_failure(document_id, owner_username, e)
+        except Exception as e:
+            logger.exception("Unexpected error processing document %s", document_id)
+            await _record_failure(document_id, owner_username, e)
         finally:
             document_queue.task_done()
-            current_document_id = None
+            _processing_ids.discard(document_id)
+
+
+def has_queue_capacity(count: int = 1) -> bool:
+    return len(_queued_ids) + count <= MAX_QUEUE_SIZE
+
 
 async def add_document_to_queue(document_id: str):
-    await document_queue.put(document_id)
+    # Never suspends, so a has_queue_capacity() check made earlier in the same
+    # event-loop step still holds when this runs.
+    document_queue.put_nowait(document_id)
+    _queued_ids.add(document_id)
     print(f"Document {document_id} added to queue.")
-    print(f"Queue contents: {list(document_queue._queue)}")
+    logger.debug("Queue depth: %d", document_queue.qsize())
 
 
-def get_queue_snapshot():
-    return list(document_queue._queue)
+def is_queued(document_id: str) -> bool:
+    return document_id in _queued_ids
 
 
 def is_currently_processing(document_id: str) -> bool:
-    return current_document_id == document_id
+    return document_id in _processing_ids
 
 
 def remove_document_from_queue(document_id: str) -> bool:
-    q = document_queue._queue
-    try:
-        q.remove(document_id)
-        return True
-    except ValueError:
+    if document_id not in _queued_ids:
         return False
+    _queued_ids.discard(document_id)
+    _cancelled_ids.add(document_id)
+    return True
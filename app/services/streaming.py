@@ -0,0 +1,24 @@
+import asyncio
+
+
+class StatusBroadcaster:
+    # Per-subscriber asyncio.Event, so bursts of transitions coalesce into a
+    # single wake-up and idle SSE clients never touch the database.
+    def __init__(self):
+        self._subscribers: dict[asyncio.Event, str | None] = {}
+
+    def subscribe(self, owner_username: str | None = None) -> asyncio.Event:
+        wakeup = asyncio.Event()
+        self._subscribers[wakeup] = owner_username
+        return wakeup
+
+    def unsubscribe(self, wakeup: asyncio.Event):
+        self._subscribers.pop(wakeup, None)
+
+    def publish(self, owner_username: str | None = None):
+        for wakeup, subscriber_owner in self._subscribers.items():
+            if owner_username is None or subscriber_owner in (None, owner_username):
+                wakeup.set()
+
+
+status_broadcaster = StatusBroadcaster()
@@ -0,0 +1,6 @@
+import os
+
+# app.services.persistence runs create_tables() against DB_PATH on import.
+# Point it at a throwaway in-memory database before any app module is
+# imported so test runs never migrate or touch the tracked data/db/app.db.
+os.environ["DB_PATH"] = "file:atom_import_db?mode=memory&cache=shared"
@@ -1,109 +1,206 @@
+import hashlib
 import os
+import shutil
+import sqlite3
 import tempfile
-import unittest
-from unittest.mock import patch
+import time
+import uuid
+from datetime import timedelta
+from unittest.mock import AsyncMock
 
-from fastapi.testclient import TestClient
+import httpx
+import pytest
 
-import app.main as main
+import app.routes.auth as auth
 import app.routes.documents as documents
 import app.services.persistence as persistence
-
-
-async def _noop_background_worker():
-    return
-
-
-async def _noop_enqueue(_document_id: str):
-    return
-
-
-class APITestCase(unittest.TestCase):
-    def setUp(self):
-        self.temp_dir = tempfile.TemporaryDirectory()
-        self.db_path = os.path.join(self.temp_dir.name, "test.db")
-        self.uploads_dir = os.path.join(self.temp_dir.name, "uploads")
-        os.makedirs(self.uploads_dir, exist_ok=True)
-
-        self.patches = [
-            patch.object(persistence, "DB_PATH", self.db_path),
-            patch.object(documents, "UPLOADS_DIR", self.uploads_dir),
-            patch.object(main, "background_worker", _noop_background_worker),
-            patch.object(documents, "add_document_to_queue", _noop_enqueue),
-        ]
-        for p in self.patches:
-            p.start()
-
-        persistence.create_tables()
-        self.client = TestClient(main.app)
-
-    def tearDown(self):
-        self.client.close()
-        for p in reversed(self.patches):
-            p.stop()
-        self.temp_dir.cleanup()
-
-    def _auth_headers(self):
-        response = self.client.post(
-            "/auth/login",
-            json={"username": "user1", "password": "password123"},
-        )
-        self.assertEqual(response.status_code, 200)
-        token = response.json()["access_token"]
-        return {"Authorization": f"Bearer {token}"}
-
-    def test_auth_and_protected_access(self):
-        invalid_login = self.client.post(
-            "/auth/login",
-            json={"username": "user1", "password": "wrong"},
-        )
-        self.assertEqual(invalid_login.status_code, 401)
-
-        protected_without_token = self.client.get("/documents")
-        self.assertEqual(protected_without_token.status_code, 401)
-
-        protected_with_token = self.client.get("/documents", headers=self._auth_headers())
-        self.assertEqual(protected_with_token.status_code, 200)
-        self.assertEqual(protected_with_token.json()["documents"], [])
-
-    def test_upload_validation_and_storage_structure(self):
-        headers = self._auth_headers()
-        files = [
-            ("files", ("valid.txt", b"hello world", "text/plain")),
-            ("files", ("invalid.csv", b"a,b,c", "text/csv")),
-        ]
-
-        response = self.client.post("/upload", headers=headers, files=files)
-        self.assertEqual(response.status_code, 200)
-        body = response.json()
-        self.assertEqual(body["uploaded_count"], 1)
-        self.assertEqual(body["failed_count"], 1)
-
-        uploaded = body["uploaded_documents"][0]
-        self.assertEqual(uploaded["filename"], "valid.txt")
-        self.assertEqual(uploaded["status"], "pending")
-        self.assertTrue(os.path.exists(uploaded["stored_path"]))
-
-        parent_dir = os.path.basename(os.path.dirname(uploaded["stored_path"]))
-        self.assertEqual(parent_dir, uploaded["document_id"])
-
-        self.assertIn("Invalid file type", body["errors"][0]["error"])
-
-    def test_documents_status_filter(self):
-        headers = self._auth_headers()
-        files = [("files", ("doc.txt", b"test document", "text/plain"))]
-        upload_response = self.client.post("/upload", headers=headers, files=files)
-        self.assertEqual(upload_response.status_code, 200)
-
-        pending_response = self.client.get("/documents?status=pending", headers=headers)
-        self.assertEqual(pending_response.status_code, 200)
-        pending_docs = pending_response.json()["documents"]
-        self.assertGreaterEqual(len(pending_docs), 1)
-        self.assertTrue(all(doc["current_status"] == "pending" for doc in pending_docs))
-
-        invalid_filter = self.client.get("/documents?status=unknown", headers=headers)
-        self.assertEqual(invalid_filter.status_code, 400)
-
-
-if __name__ == "__main__":
-    unittest.main()
+import app.services.queue_worker as queue_worker
+
+pytestmark = pytest.mark.anyio
+
+# Multipart upload body encoded once at import rather than by httpx per request.
+_UPLOAD_BOUNDARY = "atom-test-boundary"
+_UPLOAD_CONTENT_TYPE = f"multipart/form-data; boundary={_UPLOAD_BOUNDARY}"
+_UPLOAD_BODY = b"".join(
+    b"--%s\r\n"
+    b'Content-Disposition: form-data; name="files"; filename="%s"\r\n'
+    b"Content-Type: %s\r\n\r\n"
+    b"%s\r\n" % (_UPLOAD_BOUNDARY.encode(), filename, content_type, content)
+    for filename, content, content_type in (
+        (b"valid.txt", b"hello world", b"text/plain"),
+        (b"invalid.csv", b"a,b,c", b"text/csv"),
+    )
+) + b"--%s--\r\n" % _UPLOAD_BOUNDARY.encode()
+
+
+@pytest.fixture(scope="module")
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture(scope="session")
+def asgi_app():
+    # Imported on first use so collection (and each xdist worker that gets no
+    # API tests) skips building the FastAPI app.
+    from app.main import app
+
+    return app
+
+
+@pytest.fixture(scope="module")
+def enqueue():
+    # Stands in for the real queue; reset after every test by _clean_tables.
+    return AsyncMock(return_value=None)
+
+
+@pytest.fixture(scope="module")
+async def client(asgi_app, tmp_path_factory, enqueue):
+    # The app, schema and patches are set up once per module; tests only
+    # truncate tables between runs (see _clean_tables).
+
+    # Keep upload writes in RAM on Linux (tmpfs); elsewhere use pytest's tmp dir.
+    if os.path.isdir("/dev/shm"):
+        uploads_dir = tempfile.mkdtemp(prefix="atom_tests_", dir="/dev/shm")
+    else:
+        uploads_dir = str(tmp_path_factory.mktemp("uploads"))
+    # A named shared-cache in-memory database is visible to every pooled
+    # connection and lives as long as one connection to it stays open.
+    db_uri = f"file:test_db_{uuid.uuid4().hex}?mode=memory&cache=shared"
+    keeper = sqlite3.connect(db_uri, uri=True)
+
+    # ASGITransport drives the app on the test's own event loop and does not
+    # run startup/shutdown, so no background workers are started.
+    try:
+        with pytest.MonkeyPatch.context() as mp:
+            mp.setattr(persistence, "DB_PATH", db_uri)
+            mp.setattr(documents, "UPLOADS_DIR", uploads_dir)
+            mp.setattr(documents, "add_document_to_queue", enqueue)
+
+            persistence.create_tables()
+            transport = httpx.ASGITransport(app=asgi_app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as test_client:
+                yield test_client
+    finally:
+        persistence.close_db_connections()
+        keeper.close()
+        shutil.rmtree(uploads_dir, ignore_errors=True)
+
+
+@pytest.fixture(autouse=True)
+def _clean_tables(client, enqueue):
+    yield
+    enqueue.reset_mock()
+    with persistence._transaction() as cursor:
+        cursor.execute("DELETE FROM status_events")
+        cursor.execute("DELETE FROM analysis_results")
+        cursor.execute("DELETE FROM documents")
+
+
+@pytest.fixture(scope="module")
+async def auth_headers(client):
+    # One login per module; the token outlives the whole run (JWT_EXPIRY minutes).
+    response = await client.post(
+        "/auth/login",
+        json={"username": "user1", "password": "password123"},
+    )
+    assert response.status_code == 200
+    token = response.json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+async def test_auth_and_protected_access(client, auth_headers):
+    invalid_login = await client.post(
+        "/auth/login",
+        json={"username": "user1", "password": "wrong"},
+    )
+    assert invalid_login.status_code == 401
+
+    protected_without_token = await client.get("/documents")
+    assert protected_without_token.status_code == 401
+
+    protected_with_token = await client.get("/documents", headers=auth_headers)
+    assert protected_with_token.status_code == 200
+    assert protected_with_token.json()["documents"] == []
+
+
+async def test_cached_token_skips_decode(client, monkeypatch):
+    token = auth.create_access_token({"sub": "user1"}, expires_delta=timedelta(minutes=5))
+    headers = {"Authorization": f"Bearer {token}"}
+    decoded = []
+    real_decode = auth.jwt.decode
+
+    def counting_decode(*args, **kwargs):
+        decoded.append(args[0])
+        return real_decode(*args, **kwargs)
+
+    monkeypatch.setattr(auth.jwt, "decode", counting_decode)
+
+    # Router- and handler-level dependencies share a single decode per request.
+    first = await client.get("/documents", headers=headers)
+    assert first.status_code == 200
+    assert decoded == [token]
+
+    second = await client.get("/documents", headers=headers)
+    assert second.status_code == 200
+    assert decoded == [token]
+
+
+async def test_expired_token_rejected_after_caching(client, monkeypatch):
+    token = auth.create_access_token({"sub": "user1"}, expires_delta=timedelta(minutes=-1))
+    past_exp = int(time.time()) - 60
+    # Seed the cache as if the token had been verified before it expired.
+    monkeypatch.setitem(auth._token_cache, hashlib.sha256(token.encode()).digest(), ("user1", past_exp))
+
+    expired = await client.get("/documents", headers={"Authorization": f"Bearer {token}"})
+    assert expired.status_code == 401
+    assert expired.json()["detail"] == "Token has expired"
+
+
+async def test_upload_storage_and_status_filter(client, auth_headers, enqueue):
+    # One upload serves both the validation/storage checks and the listing filter.
+    response = await client.post(
+        "/upload",
+        content=_UPLOAD_BODY,
+        headers={**auth_headers, "Content-Type": _UPLOAD_CONTENT_TYPE},
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert body["uploaded_count"] == 1
+    assert body["failed_count"] == 1
+
+    uploaded = body["uploaded_documents"][0]
+    assert uploaded["filename"] == "valid.txt"
+    assert uploaded["status"] == "pending"
+    assert os.path.exists(uploaded["stored_path"])
+
+    parent_dir = os.path.basename(os.path.dirname(uploaded["stored_path"]))
+    assert parent_dir == uploaded["document_id"]
+    enqueue.assert_awaited_once_with(uploaded["document_id"])
+
+    assert "Invalid file type" in body["errors"][0]["error"]
+
+    pending_response = await client.get("/documents?status=pending", headers=auth_headers)
+    assert pending_response.status_code == 200
+    pending_docs = pending_response.json()["documents"]
+    assert {doc["current_status"] for doc in pending_docs} == {"pending"}
+
+    invalid_filter = await client.get("/documents?status=unknown", headers=auth_headers)
+    assert invalid_filter.status_code == 400
+
+
+async def test_upload_rejected_when_queue_is_full(client, auth_headers, enqueue, monkeypatch):
+    monkeypatch.setattr(queue_worker, "MAX_QUEUE_SIZE", 0)
+    stored_before = set(os.listdir(documents.UPLOADS_DIR))
+
+    response = await client.post(
+        "/upload",
+        content=_UPLOAD_BODY,
+        headers={**auth_headers, "Content-Type": _UPLOAD_CONTENT_TYPE},
+    )
+    assert response.status_code == 503
+
+    # Nothing was committed or enqueued, so no document is left pending.
+    enqueue.assert_not_awaited()
+    listing = await client.get("/documents", headers=auth_headers)
+    assert listing.json()["documents"] == []
+    assert set(os.listdir(documents.UPLOADS_DIR)) == stored_before
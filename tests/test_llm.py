@@ -0,0 +1,28 @@
+from app.services.llm import MAX_TEXT_CHARS, WORD_BOUNDARY_WINDOW, _PROMPT_HEADER, _build_prompt
+
+
+def _prompt_body(text):
+    prompt = _build_prompt(text)
+    assert prompt.startswith(_PROMPT_HEADER)
+    return prompt[len(_PROMPT_HEADER):]
+
+
+def test_short_text_is_not_truncated():
+    text = "short document text"
+    assert _prompt_body(text) == text
+
+
+def test_long_text_is_cut_on_a_nearby_word_boundary():
+    text = "word " * 5000
+    body = _prompt_body(text)
+    assert body.endswith("word")
+    assert MAX_TEXT_CHARS - WORD_BOUNDARY_WINDOW <= len(body) < MAX_TEXT_CHARS
+
+
+def test_text_without_nearby_spaces_is_cut_at_the_limit():
+    # A single early space must not pull the cut back to the first word.
+    text = "報告書 " + "本文" * 15000
+    assert _prompt_body(text) == text[:MAX_TEXT_CHARS]
+
+    other = "報告書 " + "別紙" * 15000
+    assert _build_prompt(text) != _build_prompt(other)
@@ -0,0 +1,152 @@
+import sqlite3
+
+import pytest
+
+import app.services.persistence as persistence
+
+# Schema as written by the original persistence module: CURRENT_TIMESTAMP
+# text timestamps, no owner_username on status_events and no triggers.
+_LEGACY_SCHEMA = """
+CREATE TABLE documents (
+    document_id TEXT PRIMARY KEY,
+    owner_username TEXT,
+    original_filename TEXT,
+    stored_path TEXT,
+    content_type TEXT,
+    size_bytes INTEGER,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    current_status TEXT,
+    error_message TEXT
+);
+CREATE TABLE status_events (
+    event_id TEXT PRIMARY KEY,
+    document_id TEXT,
+    status TEXT,
+    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+    metadata TEXT,
+    error_message TEXT,
+    FOREIGN KEY (document_id) REFERENCES documents(document_id)
+);
+CREATE TABLE analysis_results (
+    document_id TEXT PRIMARY KEY,
+    summary TEXT,
+    key_topics TEXT,
+    sentiment TEXT,
+    actionable_items TEXT,
+    raw_model_output TEXT,
+    FOREIGN KEY (document_id) REFERENCES documents(document_id)
+);
+"""
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    path = str(tmp_path / "app.db")
+    monkeypatch.setattr(persistence, "DB_PATH", path)
+    # Ownership is cached by document_id; keep entries from other databases out.
+    persistence._owner_cache.clear()
+    yield path
+    persistence.close_db_connections()
+    persistence._owner_cache.clear()
+
+
+def _add_document(document_id, owner_username):
+    persistence.insert_documents_metadata(
+        [(document_id, owner_username, "a.txt", "/tmp/a.txt", "text/plain", 11, "pending")]
+    )
+
+
+def test_legacy_database_is_migrated(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.executescript(_LEGACY_SCHEMA)
+    conn.execute(
+        "INSERT INTO documents VALUES ('d1', 'user1', 'a.txt', '/tmp/a.txt', 'text/plain', 11, "
+        "'2026-02-21 14:11:19', 'completed', NULL)"
+    )
+    conn.executemany(
+        "INSERT INTO status_events VALUES (?, 'd1', ?, ?, NULL, NULL)",
+        [
+            ("e2", "completed", "2026-02-21 14:11:25"),
+            ("e1", "processing", "2026-02-21 14:11:19"),
+        ],
+    )
+    conn.commit()
+    conn.close()
+
+    persistence.create_tables()
+
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT typeof(created_at) FROM documents").fetchall() == [("integer",)]
+    assert set(conn.execute("SELECT typeof(timestamp), owner_username FROM status_events")) == {
+        ("integer", "user1")
+    }
+    conn.close()
+
+    document = persistence.get_document_by_id("d1", owner_username="user1")
+    assert document["created_at"] == "2026-02-21 14:11:19"
+    history = persistence.get_document_status_history("d1", owner_username="user1")
+    assert [(event["status"], event["timestamp"]) for event in history] == [
+        ("processing", "2026-02-21 14:11:19"),
+        ("completed", "2026-02-21 14:11:25"),
+    ]
+
+    # New events on a migrated table still get integer timestamps and the trigger.
+    persistence.insert_status_event("d1", status="failed", error_message="boom")
+    document = persistence.get_document_by_id("d1")
+    assert (document["current_status"], document["error_message"]) == ("failed", "boom")
+
+
+def test_delete_cascades_to_events_and_analysis(db_path):
+    persistence.create_tables()
+    _add_document("d1", "user1")
+    _add_document("d2", "user1")
+    for document_id in ("d1", "d2"):
+        persistence.insert_status_event(document_id, status="processing")
+        persistence.insert_analysis_result(document_id, "summary", "[]", "neutral", "[]")
+
+    assert persistence.delete_document_and_related("d1", owner_username="other") is None
+    deleted = persistence.delete_document_and_related("d1", owner_username="user1")
+    assert deleted["document_id"] == "d1"
+
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT document_id FROM status_events").fetchall() == [("d2",)]
+    assert conn.execute("SELECT document_id FROM analysis_results").fetchall() == [("d2",)]
+    conn.close()
+
+
+def test_history_and_analysis_are_scoped_to_owner(db_path):
+    persistence.create_tables()
+    _add_document("d1", "user1")
+    persistence.insert_status_event("d1", status="processing")
+    persistence.insert_analysis_result("d1", "summary", "[]", "neutral", "[]")
+
+    # Checked twice so the second lookup is answered by the owner cache.
+    for _ in range(2):
+        assert persistence.get_document_status_history("d1", owner_username="other") == []
+        assert persistence.get_document_analysis_result("d1", owner_username="other") is None
+        assert len(persistence.get_document_status_history("d1", owner_username="user1")) == 1
+        assert persistence.get_document_analysis_result("d1", owner_username="user1")["summary"] == "summary"
+
+    assert persistence.get_document_status_history("missing", owner_username="user1") == []
+    assert persistence.get_document_analysis_result("missing", owner_username="user1") is None
+
+
+def test_status_events_batch_keeps_order_and_final_status(db_path):
+    persistence.create_tables()
+    _add_document("d1", "user1")
+
+    persistence.insert_status_events(
+        "d1",
+        [
+            ("processing", None, None),
+            ("analyzing", '{"chars": 11}', None),
+            ("failed", None, "LLM timeout"),
+        ],
+    )
+
+    # All three share a timestamp second, so order comes from insertion.
+    history = persistence.get_document_status_history("d1", owner_username="user1")
+    assert [event["status"] for event in history] == ["processing", "analyzing", "failed"]
+    assert history[-1]["error_message"] == "LLM timeout"
+    document = persistence.get_document_by_id("d1")
+    assert (document["current_status"], document["error_message"]) == ("failed", "LLM timeout")
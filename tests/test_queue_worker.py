@@ -0,0 +1,87 @@
+import asyncio
+import sqlite3
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import AsyncMock
+
+import pytest
+
+import app.services.persistence as persistence
+import app.services.queue_worker as queue_worker
+
+pytestmark = pytest.mark.anyio
+
+_ANALYSIS = {
+    "summary": "A short note.",
+    "key_topics": ["greeting"],
+    "sentiment": "neutral",
+    "actionable_items": [],
+    "raw_model_output": "{}",
+}
+
+
+@pytest.fixture(scope="module")
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def worker_db(monkeypatch):
+    db_uri = f"file:test_worker_{uuid.uuid4().hex}?mode=memory&cache=shared"
+    keeper = sqlite3.connect(db_uri, uri=True)
+    monkeypatch.setattr(persistence, "DB_PATH", db_uri)
+    persistence._owner_cache.clear()
+    persistence.create_tables()
+    yield db_uri
+    persistence.close_db_connections()
+    persistence._owner_cache.clear()
+    keeper.close()
+
+
+async def test_worker_records_status_transitions(worker_db, tmp_path, monkeypatch):
+    analyze = AsyncMock(return_value=_ANALYSIS)
+    monkeypatch.setattr(queue_worker, "analyze_document_with_retry", analyze)
+    # Extraction runs on threads here; spawning the process pool per test is slow.
+    extractor_threads = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(queue_worker, "_get_extractor_pool", lambda: extractor_threads)
+    # A fresh queue binds to this test's event loop.
+    monkeypatch.setattr(queue_worker, "document_queue", asyncio.Queue())
+    monkeypatch.setattr(queue_worker, "_queued_ids", set())
+    monkeypatch.setattr(queue_worker, "_cancelled_ids", set())
+    monkeypatch.setattr(queue_worker, "_processing_ids", set())
+
+    text_path = tmp_path / "ok.txt"
+    text_path.write_text("hello world")
+    persistence.insert_documents_metadata(
+        [
+            ("ok", "user1", "ok.txt", str(text_path), "text/plain", 11, "pending"),
+            ("missing", "user1", "gone.txt", str(tmp_path / "gone.txt"), "text/plain", 11, "pending"),
+            ("cancelled", "user1", "c.txt", str(text_path), "text/plain", 11, "pending"),
+        ]
+    )
+    for document_id in ("ok", "missing", "cancelled"):
+        await queue_worker.add_document_to_queue(document_id)
+    assert queue_worker.remove_document_from_queue("cancelled")
+
+    worker = asyncio.create_task(queue_worker.background_worker())
+    try:
+        # join() only returns once task_done() ran for every entry, tombstoned ones included.
+        await asyncio.wait_for(queue_worker.document_queue.join(), timeout=5)
+    finally:
+        worker.cancel()
+        await asyncio.gather(worker, return_exceptions=True)
+        extractor_threads.shutdown()
+
+    history = persistence.get_document_status_history("ok")
+    assert [event["status"] for event in history] == ["processing", "analyzing", "completed"]
+    assert persistence.get_document_analysis_result("ok")["summary"] == "A short note."
+    analyze.assert_awaited_once_with("hello world", max_retries=1)
+
+    missing = persistence.get_document_by_id("missing")
+    assert missing["current_status"] == "failed"
+    assert "does not exist" in missing["error_message"]
+
+    assert persistence.get_document_by_id("cancelled")["current_status"] == "pending"
+    assert persistence.get_document_status_history("cancelled") == []
+    assert not queue_worker._cancelled_ids
+    assert not queue_worker._processing_ids